@@ -11,21 +11,30 @@ Features added on top of user's base:
 - Supplier quick view/edit (kept in product model)
 - More robust backups & import/export
 - Role-based access to Settings/Admin actions
-- Graceful optional dependencies: fpdf, python-barcode, matplotlib
+- Graceful optional dependencies: fpdf, python-barcode, matplotlib, orjson
 
 Notes:
-- This single-file app persists to inventory.json, orders.json, users.json (created automatically), and customers.json
-- Optional libs: fpdf (PDF invoices), python-barcode (barcode generation), matplotlib (sales chart)
+- This single-file app persists to inventory.json, orders.jsonl (one order per line, plus orders_meta.json), users.json (created automatically), and customers.json
+- A legacy orders.json is migrated to orders.jsonl on first run
+- Optional libs: fpdf (PDF invoices), python-barcode (barcode generation), matplotlib (sales chart), orjson (faster saves/loads)
 
 Run: python retail_pos_full_featured.py
 """
 
 import os
+import math
 import json
 import csv
+import hashlib
+import mmap
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from datetime import datetime
 from collections import Counter, defaultdict
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import tkinter as tk
 import webbrowser
 from tkinter import messagebox, filedialog, simpledialog
@@ -37,12 +46,21 @@ try:
     from ttkbootstrap.constants import *
     TB_AVAILABLE = True
     STYLE = tb.Style()
+    THEME_NAMES = tuple(STYLE.theme_names())  # fixed once ttkbootstrap is loaded
 except Exception:
     from tkinter import ttk
     TB_AVAILABLE = False
     STYLE = None
+    THEME_NAMES = ()
     tb = None
 
+# optional fast JSON (orjson), fallback to stdlib json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except Exception:
+    ORJSON_AVAILABLE = False
+
 # optional PDF
 try:
     from fpdf import FPDF
@@ -60,8 +78,8 @@ except Exception:
 
 # optional plotting
 try:
-    import matplotlib.pyplot as plt
-    from PIL import Image, ImageTk
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
     MATPLOTLIB_AVAILABLE = True
 except Exception:
     MATPLOTLIB_AVAILABLE = False
@@ -69,28 +87,145 @@ except Exception:
 # App files
 APP_DIR = os.getcwd()
 INVENTORY_FILE = os.path.join(APP_DIR, "inventory.json")
-ORDERS_FILE = os.path.join(APP_DIR, "orders.json")
+ORDERS_FILE = os.path.join(APP_DIR, "orders.json")  # legacy, migrated to ORDERS_LOG_FILE
+ORDERS_LOG_FILE = os.path.join(APP_DIR, "orders.jsonl")
+ORDERS_META_FILE = os.path.join(APP_DIR, "orders_meta.json")
 USERS_FILE = os.path.join(APP_DIR, "users.json")
 CUSTOMERS_FILE = os.path.join(APP_DIR, "customers.json")
 BACKUP_FILE = os.path.join(APP_DIR, "data_backup.json")
+# shipped with the app (not in APP_DIR): same format as inventory.json, used when there is no inventory yet
+DEMO_INVENTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "demo_inventory.json")
 
 LOW_STOCK_THRESHOLD_DEFAULT = 5
 LOYALTY_POINTS_PER_RS = 100  # 1 point per 100 Rs
+SAVE_DEBOUNCE_MS = 500  # coalesce saves from rapid cart/inventory edits
+SEARCH_DEBOUNCE_MS = 150  # batch keystrokes in the inventory search box
+STATUS_TICK_MS = 1000  # status bar clock
+STATUS_ICONIC_TICK_MS = 5000  # slower check while the window is minimized
+BACKUP_INTERVAL_MS = 5 * 60 * 1000  # periodic full snapshot to BACKUP_FILE
+MMAP_MIN_BYTES = 1_000_000  # below this a plain read is cheaper than mapping the file
+BULK_INSERT_MIN_ROWS = 200  # hide a Treeview while inserting at least this many rows
 
 
 # --- JSON helpers ---
+def dumps_json(data) -> bytes:
+    # compact: these files are rewritten on every save, indentation only adds bytes and encode time
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
 def load_json(path):
     if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(path, "rb") as f:
+            if ORJSON_AVAILABLE and os.path.getsize(path) >= MMAP_MIN_BYTES:
+                # parse large files straight from the mapping instead of copying them into a bytes object
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as buf:
+                    return orjson.loads(buf)
+            raw = f.read()
+        return orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw.decode("utf-8"))
     return None
 
+def write_file_atomic(path, payload: bytes):
+    # readers see either the old file or the new one, never a truncated mix; no fsync, this isn't a database
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
 def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    write_file_atomic(path, dumps_json(data))
+
+# --- JSON Lines helpers (append-only order log) ---
+def dumps_json_line(data) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+    return json.dumps(data, ensure_ascii=False).encode("utf-8") + b"\n"
+
+def iter_json_lines(path):
+    if not os.path.exists(path):
+        return
+    loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                row = loads(line)
+            except ValueError:
+                if line.endswith(b"\n"):
+                    raise  # damage inside the log, not a torn append
+                continue  # unterminated last line: an append cut short by a crash
+            yield row
+
+def _repair_log_tail(f):
+    """Make sure the next append starts on a fresh line: finish a complete last record, cut a torn one."""
+    end = f.seek(0, os.SEEK_END)
+    if not end:
+        return
+    f.seek(end - 1)
+    if f.read(1) == b"\n":
+        return
+    pos = end
+    while pos:
+        step = min(4096, pos); pos -= step
+        f.seek(pos)
+        nl = f.read(step).rfind(b"\n")
+        if nl != -1:
+            pos += nl + 1
+            break
+    f.seek(pos)
+    tail = f.read()
+    try:
+        (orjson.loads if ORJSON_AVAILABLE else json.loads)(tail)
+        f.write(b"\n")
+    except ValueError:
+        f.truncate(pos)
+
+def append_json_line(path, data):
+    with open(path, "a+b") as f:  # writes always go to the end; reading is for _repair_log_tail
+        _repair_log_tail(f)
+        f.write(dumps_json_line(data))
+
+def save_json_lines(path, rows):
+    # write to a temp file first so a crash never leaves a half-written log
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        for row in rows:
+            f.write(dumps_json_line(row))
+    os.replace(tmp, path)
+
+def parse_price(text) -> float:
+    # orjson stores NaN/inf as null, which would break Product.from_dict on the next start
+    price = float(text)
+    if not math.isfinite(price):
+        raise ValueError(f"price must be a finite number, got {text!r}")
+    return price
+
+# --- Tk helpers ---
+@contextmanager
+def bulk_tree_update(tree, n_rows):
+    """Unmap a packed Treeview and hide its columns while n_rows are inserted, then put it back."""
+    if n_rows < BULK_INSERT_MIN_ROWS:
+        yield
+        return
+    info = tree.pack_info()
+    siblings = tree.master.pack_slaves()
+    idx = siblings.index(tree)
+    if idx + 1 < len(siblings):
+        info["before"] = siblings[idx + 1]  # re-pack in the same slot
+    display = tree["displaycolumns"]
+    tree.pack_forget()
+    tree.configure(displaycolumns=())
+    try:
+        yield
+    finally:
+        tree.configure(displaycolumns=display)
+        tree.pack(**info)
 
 # --- Data models ---
 class Product:
+    __slots__ = ("product_id", "name", "category", "quantity", "price", "supplier", "barcode", "_search_blob", "_combo_str")
+
     def __init__(self, product_id: int, name: str, category: str, quantity: int, price: float, supplier: str, barcode_value: str = ""):
         self.product_id = int(product_id)
         self.name = name
@@ -99,6 +234,25 @@ class Product:
         self.price = float(price)
         self.supplier = supplier
         self.barcode = barcode_value or str(product_id)  # fallback to id if not provided
+        self._combo_str = None
+        self.refresh_search_blob()
+
+    def refresh_search_blob(self):
+        # one lowercase string for inventory search; call again after editing name/category/supplier/barcode
+        self._search_blob = f"{self.name}\0{self.category}\0{self.supplier}\0{self.barcode}".lower()
+
+    def mutate(self, **fields):
+        """Set fields and invalidate the cached display/search strings."""
+        for k, v in fields.items():
+            setattr(self, k, v)
+        self._combo_str = None
+        if fields.keys() & {"name", "category", "supplier", "barcode"}:
+            self.refresh_search_blob()
+
+    def combo_label(self) -> str:
+        if self._combo_str is None:
+            self._combo_str = f"{self.product_id} | {self.name} (₹{self.price:.2f}) [{self.quantity}]"
+        return self._combo_str
 
     def to_dict(self):
         return {
@@ -113,10 +267,12 @@ class Product:
 
     @staticmethod
     def from_dict(d):
-        return Product(d["product_id"], d.get("name", ""), d.get("category", ""), d.get("quantity", 0), d.get("price", 0.0), d.get("supplier", ""), d.get("barcode", ""))
+        return Product(d["product_id"], d.get("name", ""), d.get("category", ""), d.get("quantity", 0), d.get("price") or 0.0, d.get("supplier", ""), d.get("barcode", ""))
 
 
 class OrderRecord:
+    __slots__ = ("order_id", "customer", "items", "total", "created_at", "payment", "discount", "_items_summary")
+
     def __init__(self, order_id: int, customer: str, items: List[Dict], total: float, created_at: str, payment: Dict[str, any] = None, discount: float = 0.0):
         self.order_id = order_id
         self.customer = customer
@@ -125,6 +281,14 @@ class OrderRecord:
         self.created_at = created_at
         self.payment = payment or {"method": "unknown", "details": {}}
         self.discount = discount
+        self._items_summary = None
+
+    @property
+    def items_summary(self) -> str:
+        # items never change after an order is finalized, so build the history-table text once
+        if self._items_summary is None:
+            self._items_summary = "; ".join([f"{it['name']} x {it['qty']}" for it in self.items])
+        return self._items_summary
 
     def to_dict(self):
         return {
@@ -142,14 +306,14 @@ class OrderRecord:
         return OrderRecord(d["order_id"], d["customer"], d.get("items", []), d.get("total", 0.0), d.get("created_at", ""), d.get("payment", {}), d.get("discount", 0.0))
 
 
+def load_order_log(path=ORDERS_LOG_FILE) -> List[OrderRecord]:
+    return [OrderRecord.from_dict(d) for d in iter_json_lines(path)]
+
+
 # --- Landing Page ---
-class LandingPage(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title("Welcome to SmartMart POS")
-        self.geometry("800x500")
-        self.configure(bg="white")
-        self.resizable(False, False)
+class LandingPage(tk.Frame):
+    def __init__(self, root):
+        super().__init__(root, bg="white")
 
         # Load logo
         try:
@@ -170,20 +334,14 @@ class LandingPage(tk.Tk):
                   command=self.go_to_login).pack(pady=40)
 
     def go_to_login(self):
-        self.destroy()
-        LoginPage()
+        self.master.show_login()
 
 
 # --- Login Page ---
-class LoginPage(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title("Login - SmartMart POS")
-        self.geometry("400x300")
-        self.configure(bg="white")
-        self.resizable(False, False)
-
-        self.user_store = UserStore()  # dynamic users
+class LoginPage(tk.Frame):
+    def __init__(self, root):
+        super().__init__(root, bg="white")
+        self.user_store = root.user_store  # shared with the POS view, so new users can log in right away
 
         tk.Label(self, text="Login", font=("Segoe UI", 18, "bold"), bg="white").pack(pady=20)
 
@@ -209,13 +367,14 @@ class LoginPage(tk.Tk):
         if self.user_store.validate(username, password):
             role = self.user_store.role(username)
             messagebox.showinfo("Welcome", f"Logged in as {username} (role: {role})")
-            self.destroy()
-            run_pos_app(username, on_logout=self.back_to_login)  # ✅ pass username forward
+            self.reset()
+            self.master.show_pos(username)  # ✅ pass username forward
         else:
             messagebox.showerror("Login Failed", "Invalid credentials.")
 
-    def back_to_login(self):
-        LoginPage().mainloop()
+    def reset(self):
+        self.username_entry.delete(0, tk.END)
+        self.password_entry.delete(0, tk.END)
 
 # --- Simple user store ---
 class UserStore:
@@ -274,39 +433,55 @@ class CustomerStore:
 
 
 # --- Main App ---
-class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
-    def __init__(self, username, on_logout=None):    # ✅ now accepts on_logout
-        
+class RetailPOSApp(ttk.Frame):
+    def __init__(self, root, username, on_logout=None):    # ✅ now accepts on_logout
+        super().__init__(root)
+
         self.current_user = username
         self.on_logout = on_logout        # ✅ store callback
-        self.user_store = UserStore()  # load users
-
-        if TB_AVAILABLE:
-            super().__init__(themename="flatly")
-        else:
-            super().__init__()
-
-        role = self.user_store.role(username)
-        self.title(f"Retail POS - Inventory & Billing (Extended) ({role.capitalize()}: {username})")
-
-        self.geometry("1200x750")
+        self.user_store = root.user_store  # stores are owned by AppRoot and loaded once
+        self._role = self.user_store.role(username) or "cashier"  # fixed for the session
 
           # Data stores
         self.products: List[Product] = []
-        self.orders: List[OrderRecord] = []
+        self._by_pid: Dict[int, Product] = {}
+        self._by_barcode: Dict[str, Product] = {}
+        self._pid_index: Dict[int, int] = {}  # product_id -> position in self.products
+        self._combo_values: List[str] = []  # mirrors self.products for the product combobox
+        self._orders: Optional[List[OrderRecord]] = None  # parsed on first use, see the orders property
+        self._orders_loader: Optional[threading.Thread] = None
+        self._orders_poll_after = None
+        self._report_aggs: Dict[str, Tuple[List[OrderRecord], int, object]] = {}  # see fold_orders
         self.next_pid = 1
         self.next_oid = 1000
 
         # Cart
-        self.cart_items: List[Dict] = []
+        self._cart: Dict[Tuple[int, float, float], Dict] = {}  # (product_id, disc_pct, unit_price) -> cart line; row iid is "pid:disc_pct:unit_price"
         self.cart_total: float = 0.0
         self.order_level_discount: float = 0.0
 
         # config
         self.low_stock_threshold = LOW_STOCK_THRESHOLD_DEFAULT
 
+        # pending-save state (see _mark_dirty)
+        self._dirty = False
+        self._flush_after = None
+        self._change_seq = 0  # bumped by _mark_dirty; lets _periodic_backup skip unchanged snapshots
+        self._backup_seq = -1
+
+        # save_data serializes on the UI thread; this thread does the disk writes
+        self._write_q = queue.Queue()  # (path, bytes)
+        self._last_hash: Dict[str, bytes] = {}  # path -> digest of the last payload queued for it
+        self._write_errors: Dict[str, Exception] = {}  # path -> error from its latest failed write
+        threading.Thread(target=self._writer_loop, daemon=True).start()
+        # invoice txt/pdf generation (no Tk calls) so finalizing an order doesn't block the UI
+        self._io_pool = ThreadPoolExecutor(max_workers=2)
+        self._invoice_jobs = set()
+        self._invoice_errors: List[Tuple[int, Exception]] = []  # filled by the pool, shown by _poll_invoice_jobs
+        self._invoice_poll_after = None
+
         # users/customers
-        self.customer_store = CustomerStore()
+        self.customer_store = root.customer_store
 
         # load data (or demo)
         self.load_data()
@@ -316,60 +491,236 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         self._build_ui()
 
         # after UI built, show any low-stock notifications
-        self.after(500, self.check_low_stock_startup)
+        self._low_stock_after = self.after(500, self.check_low_stock_startup)
+        self._backup_after = None  # started (and restarted after a logout) by show()
+
+    def show(self):
+        top = self.winfo_toplevel()
+        top.title(f"Retail POS - Inventory & Billing (Extended) ({self._role.capitalize()}: {self.current_user})")
+        top.geometry("1200x750")
+        top.resizable(True, True)
+        top.config(menu=self.menubar)
+        self.grid()  # back in its cell after hide(); grid_remove kept the options
+        self.tkraise()
+        if self._status_after is None:
+            self._status_tick()
+        if self._backup_after is None:
+            self._backup_after = self.after(BACKUP_INTERVAL_MS, self._periodic_backup)
+
+    def hide(self):
+        """Unmap the view on logout: a covered frame is still viewable, so Tab could reach its buttons."""
+        self._cancel_after("_status_after", "_backup_after", "_inv_search_after", "_low_stock_after")
+        self.grid_remove()
 
     def logout(self):
         if messagebox.askyesno("Logout", "Are you sure you want to logout?"):
-            self.destroy()
+            self.shutdown_io()
+            self.hide()
             if self.on_logout:
                 self.on_logout()
 
+    def _cancel_after(self, *names):
+        for name in names:
+            after_id = getattr(self, name)
+            if after_id is not None:
+                self.after_cancel(after_id)
+                setattr(self, name, None)
+
+    def destroy(self):
+        # stop every pending callback before the widgets they touch go away
+        self._cancel_after("_status_after", "_backup_after", "_flush_after", "_inv_search_after",
+                           "_low_stock_after", "_orders_poll_after", "_invoice_poll_after")
+        self._io_pool.shutdown(wait=True)  # let in-flight invoices finish writing
+        self._write_q.put(None)  # ends _writer_loop once queued writes are done
+        self.menubar.destroy()
+        super().destroy()
+
+    def shutdown_io(self):
+        """Save pending changes and wait until the writer thread and invoice jobs have put them on disk."""
+        self._flush_if_dirty()
+        self._write_q.join()
+        wait(list(self._invoice_jobs))
+
     # -------- Persistence --------
     def load_data(self):
         inv = load_json(INVENTORY_FILE)
+        if not inv and not self.products:
+            # preload demo Indian products if no inventory.json
+            inv = load_json(DEMO_INVENTORY_FILE)
         if inv:
             self.products = [Product.from_dict(d) for d in inv.get("products", [])]
-            self.next_pid = inv.get("next_pid", max((p.product_id for p in self.products), default=0) + 1)
+            self.next_pid = inv.get("next_pid") or max((p.product_id for p in self.products), default=0) + 1
+        self.reindex_products()
+
+        if not os.path.exists(ORDERS_LOG_FILE) and os.path.exists(ORDERS_FILE):
+            self.migrate_orders_json()
+        # the order log itself is only parsed when the history/reports need it
+        self._orders = None
+        meta = load_json(ORDERS_META_FILE) or {}
+        if "next_oid" in meta:
+            self.next_oid = meta["next_oid"]
         else:
-            # preload demo Indian products if no inventory.json
-            if not self.products:
-                demo = [
-                    ("Basmati Rice (5kg)", "Grocery", 50, 1200.0, "Sharma Supplies"),
-                    ("Masala Tea (250g)", "Beverage", 30, 250.0, "Tata Tea"),
-                    ("Santoor Soap (4)", "Personal Care", 100, 25.0, "Wipro"),
-                    ("Tata Salt (1kg)", "Grocery", 200, 22.0, "Tata Salt"),
-                    ("Patanjali Honey (500g)", "Grocery", 40, 299.0, "Patanjali")
-                ]
-                for name, cat, qty, price, supp in demo:
-                    self.products.append(Product(self.next_pid, name, cat, qty, price, supp))
-                    self.next_pid += 1
-
-        ords = load_json(ORDERS_FILE)
-        if ords:
-            self.orders = [OrderRecord.from_dict(d) for d in ords.get("orders", [])]
-            self.next_oid = ords.get("next_oid", max((o.order_id for o in self.orders), default=999) + 1)
+            self.next_oid = max((o.order_id for o in self.orders), default=999) + 1
+        self._saved_next_oid = meta.get("next_oid")
+
+    @property
+    def orders(self) -> List[OrderRecord]:
+        if self._orders is None:
+            self._orders = load_order_log()
+            self.refresh_orders_table()  # keep the history table in step when a report loads them first
+        return self._orders
+
+    @orders.setter
+    def orders(self, value: List[OrderRecord]):
+        self._orders = value
+
+    def ensure_orders_loaded(self):
+        """Parse the order log on a worker thread and fill the history table when done."""
+        if self._orders is not None or self._orders_loader is not None:
+            return
+        result = {}
+        self._orders_loader = threading.Thread(target=lambda: result.update(orders=load_order_log()), daemon=True)
+        self._orders_loader.start()
+        self._poll_orders_loader(result)
+
+    def _poll_orders_loader(self, result):
+        # Tk widgets must only be touched from this thread, so poll instead of calling back from the worker
+        if self._orders_loader.is_alive():
+            self._orders_poll_after = self.after(50, self._poll_orders_loader, result)
+            return
+        self._orders_poll_after = None
+        self._orders_loader = None
+        if self._orders is None and "orders" in result:  # a report may have loaded them meanwhile
+            self._orders = result["orders"]
+        self.refresh_orders_table()
+
+    def fold_orders(self, key, factory, fold):
+        """Return the report aggregate `key`, folding in only orders appended since the last call.
+
+        The order log is append-only, so a cached aggregate stays valid as long as
+        self.orders is the same list; import/clear/reload replace the list and start over.
+        """
+        orders = self.orders
+        cached = self._report_aggs.get(key)
+        if cached is None or cached[0] is not orders or cached[1] > len(orders):
+            cached = (orders, 0, factory())
+        acc = cached[2]
+        for o in orders[cached[1]:]:  # a list slice jumps straight to the new tail; islice would walk the folded orders
+            fold(acc, o)
+        self._report_aggs[key] = (orders, len(orders), acc)
+        return acc
+
+    def total_sales(self) -> float:
+        return self.fold_orders("total_sales", lambda: [0.0], self._fold_total)[0]
+
+    def order_dicts(self) -> List[Dict]:
+        # serialize without building OrderRecords when the history hasn't been loaded yet
+        if self._orders is None:
+            return list(iter_json_lines(ORDERS_LOG_FILE))
+        return [o.to_dict() for o in self._orders]
+
+    def migrate_orders_json(self):
+        """One-time move of the old orders.json list into the append-only orders.jsonl log."""
+        ords = load_json(ORDERS_FILE) or {}
+        rows = ords.get("orders", [])
+        save_json_lines(ORDERS_LOG_FILE, rows)
+        save_json(ORDERS_META_FILE, {"next_oid": ords.get("next_oid", max((d["order_id"] for d in rows), default=999) + 1)})
 
     def save_data(self):
-        save_json(INVENTORY_FILE, {"products": [p.to_dict() for p in self.products], "next_pid": self.next_pid})
-        save_json(ORDERS_FILE, {"orders": [o.to_dict() for o in self.orders], "next_oid": self.next_oid})
-        # also lightweight backup
-        save_json(BACKUP_FILE, {"products": [p.to_dict() for p in self.products], "orders": [o.to_dict() for o in self.orders], "next_pid": self.next_pid, "next_oid": self.next_oid})
+        # orders are appended to ORDERS_LOG_FILE as they are finalized, so only inventory + counters here
+        self._dirty = False
+        self.queue_write(INVENTORY_FILE, {"products": [p.to_dict() for p in self.products], "next_pid": self.next_pid})
+        self.save_order_counter()
+
+    def save_order_counter(self):
+        # written synchronously (not via the writer queue) so next_oid is on disk before the next order
+        # can be taken; a lagging counter would reuse an id and overwrite its invoice files
+        if self.next_oid != self._saved_next_oid:
+            write_file_atomic(ORDERS_META_FILE, dumps_json({"next_oid": self.next_oid}))
+            self._saved_next_oid = self.next_oid
+
+    def queue_write(self, path, data):
+        # serialize now so the file matches in-memory state at call time; the write happens off the UI thread
+        payload = dumps_json(data)
+        digest = hashlib.blake2b(payload, digest_size=16).digest()
+        if self._last_hash.get(path) == digest:
+            return  # same bytes as the last write, nothing to do
+        self._last_hash[path] = digest
+        self._write_q.put((path, payload))
+
+    def _writer_loop(self):
+        while True:
+            job = self._write_q.get()
+            if job is None:  # sent by destroy()
+                self._write_q.task_done()
+                return
+            path, payload = job
+            try:
+                write_file_atomic(path, payload)
+                self._write_errors.pop(path, None)
+            except Exception as e:
+                self._last_hash.pop(path, None)  # don't let the next identical save be skipped
+                self._write_errors[path] = e  # checked by callers that wait on the queue (backup_now)
+                traceback.print_exc()  # keep the writer alive; Tk reports callback errors the same way
+            finally:
+                self._write_q.task_done()
+
+    def rewrite_orders_log(self):
+        """Replace the whole order log; only needed when self.orders is swapped wholesale (import/reset)."""
+        save_json_lines(ORDERS_LOG_FILE, (o.to_dict() for o in self.orders))
+        self.save_order_counter()
+
+    def _periodic_backup(self):
+        if self._backup_seq != self._change_seq:  # don't re-read the order log when nothing changed
+            self.backup_and_notify()
+        self._backup_after = self.after(BACKUP_INTERVAL_MS, self._periodic_backup)
 
     
+    def _mark_dirty(self):
+        """Flag unsaved changes and schedule a single save for a burst of edits."""
+        self._dirty = True
+        self._change_seq += 1
+        if self._flush_after is None:
+            self._flush_after = self.after(SAVE_DEBOUNCE_MS, self._flush_if_dirty)
+
+    def _flush_if_dirty(self):
+        if self._flush_after is not None:
+            self.after_cancel(self._flush_after)
+            self._flush_after = None
+        if self._dirty:
+            self.save_data()
+
+    def reindex_products(self):
+        """Rebuild the id/barcode lookup dicts after self.products is replaced."""
+        self._by_pid = {p.product_id: p for p in self.products}
+        self._pid_index = {p.product_id: i for i, p in enumerate(self.products)}
+        self._by_barcode = {}
+        for p in self.products:
+            self._by_barcode.setdefault(p.barcode, p)  # first match wins, as the old scan did
+
+    def _reindex_barcode(self, bc):
+        """Point bc at the first product carrying it, as reindex_products would (O(N); only on barcode edits/deletes)."""
+        holder = next((p for p in self.products if p.barcode == bc), None)
+        if holder is None:
+            self._by_barcode.pop(bc, None)
+        else:
+            self._by_barcode[bc] = holder
+
     def current_role(self):
-        return self.user_store.role(self.current_user)
+        return self._role
 
     # -------- UI construction --------
     def _build_ui(self):
 
-        menubar = tk.Menu(self)
+        # attached to the window in show(), since this view is a frame
+        self.menubar = menubar = tk.Menu(self.winfo_toplevel())
         account_menu = tk.Menu(menubar, tearoff=0)
         account_menu.add_command(label="Logout", command=self.logout)
         menubar.add_cascade(label="Account", menu=account_menu)
-        self.config(menu=menubar)
     
         nb = tb.Notebook(self, bootstyle="secondary") if TB_AVAILABLE else ttk.Notebook(self)
         nb.pack(fill="both", expand=True, padx=8, pady=8)
+        self.nb = nb
 
         inv_tab = ttk.Frame(nb)
         create_tab = ttk.Frame(nb)
@@ -380,9 +731,15 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         nb.add(create_tab, text="Create Order")
         nb.add(history_tab, text="Orders History")
         nb.add(reports_tab, text="Reports")
+        self.history_tab = history_tab
+        self._tab_keys = {str(inv_tab): "inv", str(create_tab): "create"}
+        self._current_tab = "inv"
+        # tabs whose widgets went stale while hidden; redrawn on the next switch
+        self._tab_dirty = {"inv": False, "create": False}
+        nb.bind("<<NotebookTabChanged>>", self._on_tab_changed)
 
         # ✅ Only add Settings tab if current user is admin
-        if self.current_role() == "admin":
+        if self._role == "admin":
           settings_tab = ttk.Frame(nb)
           nb.add(settings_tab, text="Settings")
           self._build_settings_tab(settings_tab)
@@ -395,14 +752,26 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
 
         # --- Status Bar ---
         self.status_var = tk.StringVar()
-        role = self.user_store.role(self.current_user)
-        self.status_var.set(f"User: {self.current_user} ({role}) | Cart Total: ₹{self.cart_total:.2f}")
+        self._last_status = None
+        self._status_after = None
+        self.status_var.set(f"User: {self.current_user} ({self._role}) | Cart Total: ₹{self.cart_total:.2f}")
 
         status_bar = ttk.Label(self, textvariable=self.status_var, relief="sunken", anchor="w")
         status_bar.pack(side="bottom", fill="x")
 
-        # keep updating clock + cart total
-        self.update_status_bar()
+        # clock + cart total are kept updating by _status_tick, started in show()
+
+    def _on_tab_changed(self, _event=None):
+        selected = self.nb.select()
+        self._current_tab = self._tab_keys.get(selected)
+        if selected == str(self.history_tab):
+            self.ensure_orders_loaded()
+        elif self._tab_dirty.get(self._current_tab):
+            self._tab_dirty[self._current_tab] = False
+            if self._current_tab == "inv":
+                self.refresh_inventory_table()
+            else:
+                self.refresh_product_combobox()
 
    # -------- Inventory Tab --------
     def _build_inventory_tab(self, parent):
@@ -434,7 +803,8 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         mid = ttk.Frame(parent); mid.pack(fill="x", padx=6, pady=6)
         ttk.Label(mid, text="Search:").pack(side="left", padx=(0,6))
         self.inv_search_var = tk.StringVar()
-        self.inv_search_var.trace_add("write", lambda *_: self.refresh_inventory_table())
+        self._inv_search_after = None
+        self.inv_search_var.trace_add("write", lambda *_: self.schedule_inventory_search())
         ttk.Entry(mid, textvariable=self.inv_search_var, width=40).pack(side="left")
         ttk.Button(mid, text="Import CSV", command=self.inv_import_csv).pack(side="right", padx=4)
         ttk.Button(mid, text="Export CSV", command=self.inv_export_csv).pack(side="right", padx=4)
@@ -442,6 +812,7 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
 
         cols = ("ID", "Name", "Category", "Qty", "Price", "Supplier", "Barcode")
         self.inv_tree = ttk.Treeview(parent, columns=cols, show="headings", selectmode="browse")
+        self._inv_row_values: Dict[int, tuple] = {}  # product_id -> values currently shown (row iid is str(product_id))
         for c in cols:
             self.inv_tree.heading(c, text=c)
             self.inv_tree.column(c, width=160 if c == "Name" else 100, anchor="w")
@@ -457,7 +828,7 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
             return
         try:
             qty = int(self.inv_qty.get().strip())
-            price = float(self.inv_price.get().strip())
+            price = parse_price(self.inv_price.get().strip())
         except Exception:
             messagebox.showwarning("Invalid", "Quantity must be integer, price numeric")
             return
@@ -467,9 +838,12 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         pid = self.next_pid; self.next_pid += 1
         p = Product(pid, name, cat, qty, price, supp, bc)
         if not p.barcode:
-            p.barcode = str(pid)
+            p.mutate(barcode=str(pid))
         self.products.append(p)
-        self.save_data()
+        self._by_pid[pid] = p
+        self._pid_index[pid] = len(self.products) - 1
+        self._by_barcode.setdefault(p.barcode, p)
+        self._mark_dirty()
         self.clear_inv_inputs()
         self.refresh_inventory_table()
         self.refresh_product_combobox()
@@ -490,12 +864,16 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         bc = self.inv_barcode.get().strip() or prod.barcode
         try:
             qty = int(self.inv_qty.get().strip()) if self.inv_qty.get().strip() else prod.quantity
-            price = float(self.inv_price.get().strip()) if self.inv_price.get().strip() else prod.price
+            price = parse_price(self.inv_price.get().strip()) if self.inv_price.get().strip() else prod.price
         except Exception:
             messagebox.showwarning("Invalid", "Quantity must be integer, price numeric")
             return
-        prod.name, prod.category, prod.quantity, prod.price, prod.supplier, prod.barcode = name, cat, qty, price, supp, bc
-        self.save_data()
+        old_bc = prod.barcode
+        prod.mutate(name=name, category=cat, quantity=qty, price=price, supplier=supp, barcode=bc)
+        if bc != old_bc:
+            self._reindex_barcode(old_bc)
+            self._reindex_barcode(bc)
+        self._mark_dirty()
         self.clear_inv_inputs()
         self.refresh_inventory_table()
         self.refresh_product_combobox()
@@ -510,8 +888,13 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         vals = self.inv_tree.item(sel[0], "values")
         pid = int(vals[0])
         if messagebox.askyesno("Confirm", f"Delete product ID {pid}?"):
-            self.products = [p for p in self.products if p.product_id != pid]
-            self.save_data()
+            prod = self._by_pid.pop(pid, None)
+            if prod is None: return
+            self.products.remove(prod)
+            if self._by_barcode.get(prod.barcode) is prod:
+                self._reindex_barcode(prod.barcode)  # another product may share the barcode
+            self._pid_index = {p.product_id: i for i, p in enumerate(self.products)}
+            self._mark_dirty()
             self.refresh_inventory_table()
             self.refresh_product_combobox()
 
@@ -520,13 +903,31 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         if not path: return
         try:
             with open(path, newline="", encoding="utf-8") as f:
-                rdr = csv.DictReader(f)
-                self.products = []
+                rdr = csv.reader(f)
+                col = {name: i for i, name in enumerate(next(rdr, []))}
+                i_id, i_name = col["product_id"], col["name"]
+                i_cat, i_qty, i_price, i_supp, i_bc = (col.get(c) for c in ("category", "quantity", "price", "supplier", "barcode"))
+                # build the list and its indexes in one pass; self is only touched once the whole file parsed
+                products, by_pid, by_barcode, pid_index = [], {}, {}, {}
+                max_pid = 0
                 for row in rdr:
-                    p = Product(int(row["product_id"]), row["name"], row.get("category",""), int(row.get("quantity",0)), float(row.get("price",0.0)), row.get("supplier",""), row.get("barcode",""))
-                    self.products.append(p)
-                self.next_pid = max((p.product_id for p in self.products), default=0) + 1
-            self.save_data()
+                    if not row:
+                        continue
+                    p = Product(int(row[i_id]), row[i_name],
+                                row[i_cat] if i_cat is not None else "",
+                                int(row[i_qty]) if i_qty is not None else 0,
+                                parse_price(row[i_price]) if i_price is not None else 0.0,
+                                row[i_supp] if i_supp is not None else "",
+                                row[i_bc] if i_bc is not None else "")
+                    pid_index[p.product_id] = len(products)
+                    products.append(p)
+                    by_pid[p.product_id] = p
+                    by_barcode.setdefault(p.barcode, p)
+                    if p.product_id > max_pid:
+                        max_pid = p.product_id
+            self.products, self._by_pid, self._by_barcode, self._pid_index = products, by_pid, by_barcode, pid_index
+            self.next_pid = max_pid + 1
+            self._mark_dirty()
             self.refresh_inventory_table()
             self.refresh_product_combobox()
             messagebox.showinfo("Import", "Inventory imported from CSV")
@@ -565,26 +966,77 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
             self.inv_supp.delete(0, tk.END); self.inv_supp.insert(0, prod.supplier)
             self.inv_barcode.delete(0, tk.END); self.inv_barcode.insert(0, prod.barcode)
 
+    def schedule_inventory_search(self):
+        if self._inv_search_after is not None:
+            self.after_cancel(self._inv_search_after)
+        self._inv_search_after = self.after(SEARCH_DEBOUNCE_MS, self._run_inventory_search)
+
+    def _run_inventory_search(self):
+        self._inv_search_after = None
+        self.refresh_inventory_table()
+
     def refresh_inventory_table(self):
+        if self._current_tab != "inv":
+            self._tab_dirty["inv"] = True
+            return
         query = self.inv_search_var.get().strip().lower() if hasattr(self, "inv_search_var") else ""
-        for r in self.inv_tree.get_children(): self.inv_tree.delete(r)
+        wanted = {}
         for p in self.products:
-            if query:
-                if query not in p.name.lower() and query not in p.category.lower() and query not in p.supplier.lower() and query not in p.barcode.lower():
-                    continue
-            display_price = f"₹{p.price:.2f}"
-            self.inv_tree.insert("", tk.END, values=(p.product_id, p.name, p.category, p.quantity, display_price, p.supplier, p.barcode))
+            if query and query not in p._search_blob:
+                continue
+            wanted[p.product_id] = self._inv_row(p)
+
+        # only touch rows that appeared, disappeared or changed
+        shown = self._inv_row_values
+        if [pid for pid in shown if pid in wanted] != [pid for pid in wanted if pid in shown]:
+            # product order changed (import/reset): start from an empty table
+            self.inv_tree.delete(*self.inv_tree.get_children())
+            shown = {}
+        else:
+            for pid in shown:
+                if pid not in wanted:
+                    self.inv_tree.delete(str(pid))
+        new_shown = {}
+        n_new = sum(1 for pid in wanted if pid not in shown)
+        with bulk_tree_update(self.inv_tree, n_new):
+            for idx, (pid, vals) in enumerate(wanted.items()):
+                old = shown.get(pid)
+                if old is None:
+                    self.inv_tree.insert("", idx, iid=str(pid), values=vals)  # keeps rows in product order
+                elif old != vals:
+                    self.inv_tree.item(str(pid), values=vals)
+                new_shown[pid] = vals
+        self._inv_row_values = new_shown
+
+    def refresh_inventory_rows(self, *prods):
+        """Like refresh_inventory_table, but only redraws the given products (e.g. after a stock change)."""
+        if self._current_tab != "inv":
+            self._tab_dirty["inv"] = True
+            return
+        shown = self._inv_row_values
+        for prod in prods:
+            pid = prod.product_id
+            old = shown.get(pid)
+            if old is None:
+                continue  # filtered out by the search; quantity isn't searchable so it stays hidden
+            vals = self._inv_row(prod)
+            if vals != old:
+                self.inv_tree.item(str(pid), values=vals)
+                shown[pid] = vals
+
+    @staticmethod
+    def _inv_row(p: Product):
+        return (p.product_id, p.name, p.category, p.quantity, f"₹{p.price:.2f}", p.supplier, p.barcode)
 
     def get_product(self, pid) -> Optional[Product]:
-        for p in self.products:
-            if p.product_id == pid: return p
-        return None
+        return self._by_pid.get(int(pid))
 
     def find_by_barcode(self, bc) -> Optional[Product]:
-        for p in self.products:
-            if p.barcode == bc or str(p.product_id) == str(bc):
-                return p
-        return None
+        p = self._by_barcode.get(bc)
+        if p is not None:
+            return p
+        # fall back to a typed product id; isdecimal() (unlike isdigit(), e.g. "²") guarantees int() accepts it
+        return self._by_pid.get(int(bc)) if bc.isdecimal() else None
 
     # -------- Create Order Tab --------
     def _build_create_order_tab(self, parent):
@@ -646,25 +1098,52 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
             messagebox.showerror("Not found", "Product not found for barcode")
             return
         # set combo and qty to 1 and add
-        self.prod_combo.set(f"{prod.product_id} | {prod.name} (₹{prod.price:.2f}) [{prod.quantity}]")
+        self.prod_combo.set(prod.combo_label())
         self.qty_spin.set(1)
         self.ui_add_to_cart()
 
     def refresh_product_combobox(self):
+        if self._current_tab != "create":
+            self._tab_dirty["create"] = True
+            return
         if hasattr(self, "prod_combo"):
-            vals = [f"{p.product_id} | {p.name} (₹{p.price:.2f}) [{p.quantity}]" for p in self.products]
-            self.prod_combo['values'] = vals
+            self._combo_values = [p.combo_label() for p in self.products]
+            self.prod_combo['values'] = self._combo_values
+
+    def refresh_product_combo_entries(self, *prods):
+        """Like refresh_product_combobox, but only re-labels the given products (e.g. after a stock change)."""
+        if not hasattr(self, "prod_combo"):
+            return
+        if self._current_tab != "create":
+            self._tab_dirty["create"] = True
+            return
+        for prod in prods:
+            idx = self._pid_index.get(prod.product_id)
+            if idx is None or idx >= len(self._combo_values):
+                self.refresh_product_combobox()
+                return
+            self._combo_values[idx] = prod.combo_label()
+        self.prod_combo['values'] = self._combo_values
 
     def update_status_bar(self):
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        role = self.user_store.role(self.current_user)
-        self.status_var.set(f"User: {self.current_user} ({role}) | Cart Total: ₹{self.cart_total:.2f} | {now}")
-        self.after(1000, self.update_status_bar)  # update every second
+        text = f"User: {self.current_user} ({self._role}) | Cart Total: ₹{self.cart_total:.2f} | {now}"
+        if text != self._last_status:  # skip the label redraw when nothing visible changed
+            self._last_status = text
+            self.status_var.set(text)
+
+    def _status_tick(self):
+        # the only self-rescheduling loop; update_status_bar itself never reschedules
+        if self.winfo_toplevel().state() == "iconic":
+            self._status_after = self.after(STATUS_ICONIC_TICK_MS, self._status_tick)
+            return
+        self.update_status_bar()
+        self._status_after = self.after(STATUS_TICK_MS, self._status_tick)
 
 
     def update_cart_total(self):
         """Recalculate cart total (with discount) and refresh status bar."""
-        subtotal = sum(item["line_total"] for item in self.cart_items)
+        subtotal = sum(item["line_total"] for item in self._cart.values())
         if self.order_level_discount:
             total = subtotal * (1 - self.order_level_discount / 100.0)
         else:
@@ -698,7 +1177,7 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         if prod.quantity < qty:
             messagebox.showwarning("Stock", f"Only {prod.quantity} available")
             return
-        prod.quantity -= qty
+        prod.mutate(quantity=prod.quantity - qty)
         unit = prod.price
         line = unit * qty
         if disc_pct:
@@ -706,11 +1185,16 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
             line -= discount_amount
         else:
             discount_amount = 0.0
-        item = {"product_id": prod.product_id, "name": prod.name, "qty": qty, "unit_price": unit, "line_total": line, "disc_pct": disc_pct, "disc_amount": discount_amount}
-        self.cart_items.append(item)
+        key = (prod.product_id, disc_pct, unit)
+        item = self._cart.get(key)
+        if item:
+            # same product scanned again at the same discount and price: grow the existing line
+            item["qty"] += qty; item["line_total"] += line; item["disc_amount"] += discount_amount
+        else:
+            self._cart[key] = {"product_id": prod.product_id, "name": prod.name, "qty": qty, "unit_price": unit, "line_total": line, "disc_pct": disc_pct, "disc_amount": discount_amount}
         self.cart_total += line
-        self.save_data()
-        self.refresh_cart_tree(); self.refresh_inventory_table(); self.refresh_product_combobox()
+        self._mark_dirty()
+        self.refresh_cart_tree(); self.refresh_inventory_rows(prod); self.refresh_product_combo_entries(prod)
         self.update_cart_total()
 
     def ui_remove_cart_item(self):
@@ -718,33 +1202,39 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         if not sel:
             messagebox.showinfo("Select", "Select an item in cart")
             return
-        vals = self.cart_tree.item(sel[0], "values")
-        pid = int(vals[0]); qty = int(vals[2])
-        for i, it in enumerate(self.cart_items):
-            if it["product_id"] == pid and it["qty"] == qty:
-                prod = self.get_product(pid)
-                if prod:
-                    prod.quantity += it["qty"]
-                self.cart_total -= it["line_total"]
-                del self.cart_items[i]
-                break
-        self.save_data()
-        self.refresh_cart_tree(); self.refresh_inventory_table(); self.refresh_product_combobox()
+        pid, disc_pct, unit = sel[0].split(":")
+        it = self._cart.pop((int(pid), float(disc_pct), float(unit)), None)
+        if it is None:
+            return
+        prod = self.get_product(it["product_id"])
+        if prod:
+            prod.mutate(quantity=prod.quantity + it["qty"])
+        self.cart_total -= it["line_total"]
+        self._mark_dirty()
+        self.refresh_cart_tree()
+        if prod:
+            self.refresh_inventory_rows(prod); self.refresh_product_combo_entries(prod)
         self.update_cart_total()
 
     def ui_clear_cart(self):
-        for it in self.cart_items:
-            prod = self.get_product(it["product_id"])
+        touched = []
+        by_pid = self._by_pid
+        for it in self._cart.values():
+            prod = by_pid.get(it["product_id"])
             if prod:
-                prod.quantity += it["qty"]
-        self.cart_items = []; self.cart_total = 0.0; self.order_level_discount = 0.0
-        self.save_data(); self.refresh_cart_tree(); self.refresh_inventory_table(); self.refresh_product_combobox()
+                prod.mutate(quantity=prod.quantity + it["qty"])
+                touched.append(prod)
+        self._cart = {}; self.cart_total = 0.0; self.order_level_discount = 0.0
+        self._mark_dirty(); self.refresh_cart_tree(); self.refresh_inventory_rows(*touched); self.refresh_product_combo_entries(*touched)
         self.update_cart_total()
 
     def refresh_cart_tree(self):
-        for r in self.cart_tree.get_children(): self.cart_tree.delete(r)
-        for it in self.cart_items:
-            self.cart_tree.insert("", tk.END, values=(it["product_id"], it["name"], it["qty"], f"{it.get('disc_pct',0):.1f}", f"₹{it['unit_price']:.2f}", f"₹{it['line_total']:.2f}"))
+        tree = self.cart_tree
+        tree.delete(*tree.get_children())
+        insert, end = tree.insert, tk.END
+        # the cart key already carries pid, disc_pct and unit price, so no per-line dict lookups for them
+        for (pid, disc_pct, unit), it in self._cart.items():
+            insert("", end, iid=f"{pid}:{disc_pct}:{unit!r}", values=(pid, it["name"], it["qty"], f"{disc_pct:.1f}", f"₹{unit:.2f}", f"₹{it['line_total']:.2f}"))
         total_display = self.cart_total
         if self.order_level_discount:
             total_display = total_display * (1 - self.order_level_discount/100.0)
@@ -760,7 +1250,7 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         self.update_cart_total()
 
     def ui_finalize_order(self):
-        if not self.cart_items:
+        if not self._cart:
             messagebox.showwarning("Empty", "Cart is empty"); return
         customer = self.cust_entry.get().strip(); city = self.city_entry.get().strip()
         if not customer:
@@ -770,7 +1260,7 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         created_at = datetime.now().isoformat(timespec='seconds')
 
         # compute totals and apply order-level discount
-        subtotal = sum(it['line_total'] for it in self.cart_items)
+        subtotal = sum(it['line_total'] for it in self._cart.values())
         discount_amount = subtotal * (self.order_level_discount/100.0)
         total = subtotal - discount_amount
 
@@ -780,19 +1270,23 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
             # user cancelled payment
             return
 
-        rec = OrderRecord(oid, cust_str, list(self.cart_items), total, created_at, payment, self.order_level_discount)
-        self.orders.append(rec)
+        # the order takes ownership of the cart lines; the cart starts over with a fresh dict
+        items = list(self._cart.values()); self._cart = {}
+        rec = OrderRecord(oid, cust_str, items, total, created_at, payment, self.order_level_discount)
+        if self._orders is not None or self._orders_loader is not None:
+            self.orders.append(rec)  # otherwise the log is parsed later and will include it
+        append_json_line(ORDERS_LOG_FILE, rec.to_dict())
+        self.save_order_counter()
         # loyalty points: 1 point per LOYALTY_POINTS_PER_RS rupees
         pts = int(total // LOYALTY_POINTS_PER_RS)
         if customer:
             self.customer_store.add_points(customer, pts)
 
-        self.save_data(); self.write_invoice(rec)
-        messagebox.showinfo("Order", f"Order {rec.order_id} saved. Invoices created. Loyalty points awarded: {pts}")
-        self.cart_items = []; self.cart_total = 0.0; self.order_level_discount = 0.0
-        self.refresh_cart_tree(); self.refresh_orders_table()
+        self._mark_dirty(); self.submit_invoice(rec)
+        messagebox.showinfo("Order", f"Order {rec.order_id} saved. Invoice is being generated. Loyalty points awarded: {pts}")
+        self.cart_total = 0.0; self.order_level_discount = 0.0
+        self.refresh_cart_tree(); self.append_order_row(rec)
         self.cust_entry.delete(0, tk.END); self.city_entry.delete(0, tk.END)
-        self.refresh_product_combobox(); self.refresh_inventory_table()
         self.update_cart_total()
 
 
@@ -801,34 +1295,66 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         self.wait_window(dlg)
         return dlg.result
 
+    def submit_invoice(self, rec: OrderRecord):
+        fut = self._io_pool.submit(self.write_invoice, rec)
+        self._invoice_jobs.add(fut)
+        fut.add_done_callback(lambda f, oid=rec.order_id: self._invoice_done(oid, f))
+        if self._invoice_poll_after is None:
+            self._invoice_poll_after = self.after(200, self._poll_invoice_jobs)
+
+    def _invoice_done(self, oid, fut):
+        # runs on the pool thread; only plain Python here
+        exc = fut.exception()
+        if exc is not None:
+            traceback.print_exception(type(exc), exc, exc.__traceback__)
+            self._invoice_errors.append((oid, exc))  # before the discard, so the poll can't miss it
+        self._invoice_jobs.discard(fut)
+
+    def _poll_invoice_jobs(self):
+        # same idea as _poll_orders_loader: report pool failures from the Tk thread
+        pending = bool(self._invoice_jobs)
+        while self._invoice_errors:
+            oid, exc = self._invoice_errors.pop(0)
+            messagebox.showerror("Invoice", f"Invoice for order {oid} could not be written:\n{exc}")
+        self._invoice_poll_after = self.after(200, self._poll_invoice_jobs) if pending else None
+
     def write_invoice(self, rec: OrderRecord):
         txt_name = f"invoice_{rec.order_id}.txt"
-        lines = []
-        lines.append(f"INVOICE - Order #{rec.order_id}")
-        lines.append(f"Customer: {rec.customer}")
-        lines.append(f"Date: {rec.created_at}")
-        lines.append("")
-        lines.append("{:<40} {:>5} {:>8} {:>12}".format("Item","Qty","Disc","Line"))
-        lines.append("-"*80)
-        for it in rec.items:
-            lines.append("{:<40} {:>5} {:>8.2f} {:>12.2f}".format(it["name"][:40], it["qty"], it.get("disc_pct",0.0), it["line_total"]))
-        lines.append("-"*80)
-        lines.append(f"ORDER DISC %: {rec.discount:.2f}")
-        lines.append(f"TOTAL (Rs.): {rec.total:.2f}")
-        lines.append(f"Payment: {rec.payment.get('method')} {rec.payment.get('details')}")
+        rule = "-"*80 + "\n"
         with open(txt_name, "w", encoding="utf-8") as f:
-            f.write("\n".join(lines))
+            w = f.write  # straight into the file buffer, no joined copy of the whole invoice
+            w(f"INVOICE - Order #{rec.order_id}\n")
+            w(f"Customer: {rec.customer}\n")
+            w(f"Date: {rec.created_at}\n")
+            w("\n")
+            w("{:<40} {:>5} {:>8} {:>12}\n".format("Item","Qty","Disc","Line"))
+            w(rule)
+            for it in rec.items:
+                w("{:<40} {:>5} {:>8.2f} {:>12.2f}\n".format(it["name"][:40], it["qty"], it.get("disc_pct",0.0), it["line_total"]))
+            w(rule)
+            w(f"ORDER DISC %: {rec.discount:.2f}\n")
+            w(f"TOTAL (Rs.): {rec.total:.2f}\n")
+            w(f"Payment: {rec.payment.get('method')} {rec.payment.get('details')}\n")
         if PDF_AVAILABLE:
             pdf_name = f"invoice_{rec.order_id}.pdf"
             pdf = FPDF()
             pdf.add_page(); pdf.set_auto_page_break(True, margin=15); pdf.set_font("Arial", size=11)
             pdf.cell(0,8, f"Invoice - Order #{rec.order_id}", ln=True)
             pdf.cell(0,6, f"Customer: {rec.customer}", ln=True); pdf.cell(0,6, f"Date: {rec.created_at}", ln=True); pdf.ln(4)
-            pdf.set_font("Arial", style="B", size=11)
-            pdf.cell(90,8,"Item", border=1); pdf.cell(25,8,"Qty", border=1, align="R"); pdf.cell(25,8,"Disc%", border=1, align="R"); pdf.cell(35,8,"Line (Rs.)", border=1, align="R"); pdf.ln()
-            pdf.set_font("Arial", size=11)
-            for it in rec.items:
-                pdf.cell(90,8, it["name"][:40], border=1); pdf.cell(25,8, str(it["qty"]), border=1, align="R"); pdf.cell(25,8, f"{it.get('disc_pct',0):.2f}", border=1, align="R"); pdf.cell(35,8, f"{it['line_total']:.2f}", border=1, align="R"); pdf.ln()
+            rows = [(it["name"][:40], str(it["qty"]), f"{it.get('disc_pct',0):.2f}", f"{it['line_total']:.2f}") for it in rec.items]
+            if hasattr(pdf, "table"):
+                # fpdf2 >= 2.7: one table layout pass instead of four bordered cells per item
+                with pdf.table(width=175, col_widths=(90, 25, 25, 35), align="LEFT", line_height=8,
+                               text_align=("LEFT", "RIGHT", "RIGHT", "RIGHT")) as table:
+                    for cells in [("Item", "Qty", "Disc%", "Line (Rs.)")] + rows:
+                        row = table.row()
+                        for text in cells: row.cell(text)
+            else:
+                pdf.set_font("Arial", style="B", size=11)
+                pdf.cell(90,8,"Item", border=1); pdf.cell(25,8,"Qty", border=1, align="R"); pdf.cell(25,8,"Disc%", border=1, align="R"); pdf.cell(35,8,"Line (Rs.)", border=1, align="R"); pdf.ln()
+                pdf.set_font("Arial", size=11)
+                for name, qty, disc, line in rows:
+                    pdf.cell(90,8, name, border=1); pdf.cell(25,8, qty, border=1, align="R"); pdf.cell(25,8, disc, border=1, align="R"); pdf.cell(35,8, line, border=1, align="R"); pdf.ln()
             pdf.ln(4); pdf.set_font("Arial", style="B", size=12); pdf.cell(0,8, txt=f"ORDER DISC %: {rec.discount:.2f}", ln=True); pdf.cell(0,8, txt=f"TOTAL (Rs.): {rec.total:.2f}", ln=True); pdf.cell(0,8, txt=f"Payment: {rec.payment.get('method')}", ln=True)
             pdf.output(pdf_name)
 
@@ -860,33 +1386,40 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         )
         self.total_sales_label.pack(anchor="e", padx=10, pady=4)
 
-        self.refresh_orders_table()   # load immediately
+        self.refresh_orders_table()   # no-op until the tab is first shown (see ensure_orders_loaded)
         self.orders_tree.bind("<Double-1>", self.on_order_double_click)
 
 
 
     def refresh_orders_table(self):
-        if not hasattr(self, "orders_tree"):
+        if not hasattr(self, "orders_tree") or self._orders is None:
             return
 
-        # Clear old rows
-        for r in self.orders_tree.get_children():
-            self.orders_tree.delete(r)
+        tree = self.orders_tree
+        rows = [self._order_row(o) for o in self.orders]
 
-        total_sales = 0.0
+        # Clear old rows (one Tcl call) and refill
+        tree.delete(*tree.get_children())
+        with bulk_tree_update(tree, len(rows)):
+            for values in rows:
+                tree.insert("", tk.END, values=values)
+        self.update_total_sales_label()
 
-        # Refill with orders
-        for o in self.orders:
-            items_summary = "; ".join([f"{it['name']} x {it['qty']}" for it in o.items])
-            self.orders_tree.insert(
-                "", tk.END,
-                values=(o.order_id, o.customer, items_summary, f"₹{o.total:.2f}", o.created_at)
-            )
-            total_sales += float(o.total)
+    def append_order_row(self, rec: OrderRecord):
+        """Add a just-finalized order to the history table without redrawing the rest."""
+        if not hasattr(self, "orders_tree") or self._orders is None:
+            return
+        self.orders_tree.insert("", tk.END, values=self._order_row(rec))
+        self.update_total_sales_label()
+
+    @staticmethod
+    def _order_row(o: OrderRecord):
+        return (o.order_id, o.customer, o.items_summary, f"₹{o.total:.2f}", o.created_at)
 
+    def update_total_sales_label(self):
         # ✅ Update total sales label
         if hasattr(self, "total_sales_label"):
-            self.total_sales_label.config(text=f"Total Sales: ₹{total_sales:.2f}")
+            self.total_sales_label.config(text=f"Total Sales: ₹{self.total_sales():.2f}")
 
 
     def on_order_double_click(self, event):
@@ -948,15 +1481,17 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         if not path: return
         with open(path, "w", newline="", encoding="utf-8") as f:
             w = csv.writer(f); w.writerow(["order_id","customer","items","total","created_at","payment","discount"])
-            for o in self.orders:
-                items_str = ";".join([f"{it['name']}|{it['qty']}" for it in o.items])
-                w.writerow([o.order_id, o.customer, items_str, o.total, o.created_at, json.dumps(o.payment), o.discount])
+            dumps = json.dumps
+            w.writerows(
+                (o.order_id, o.customer, ";".join([f"{it['name']}|{it['qty']}" for it in o.items]), o.total, o.created_at, dumps(o.payment), o.discount)
+                for o in self.orders
+            )
         messagebox.showinfo("Export", f"Orders exported to {path}")
 
     # -------- Reports Tab --------
     def _build_reports_tab(self, parent):
         top = ttk.Frame(parent); top.pack(fill="x", padx=6, pady=6)
-        role = self.current_role()
+        role = self._role
 
         if role == "admin":
           ttk.Button(top, text="Low-stock (<=threshold)", command=self.report_low_stock).pack(side="left", padx=6)
@@ -1014,61 +1549,67 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
 
 
     def report_low_stock(self):
-        rows = [p for p in self.products if p.quantity <= self.low_stock_threshold]
+        rows = self.low_stock_products()
         if not rows:
             self.report_text.delete("1.0", tk.END); self.report_text.insert("1.0", "No low-stock items."); return
-        out = f"Low-stock items (<= {self.low_stock_threshold}):\n\n"
-        for p in rows: out += f"ID {p.product_id}: {p.name} - Qty {p.quantity}\n"
-        self.report_text.delete("1.0", tk.END); self.report_text.insert("1.0", out)
+        parts = [f"Low-stock items (<= {self.low_stock_threshold}):\n\n"]
+        parts.extend(f"ID {p.product_id}: {p.name} - Qty {p.quantity}\n" for p in rows)
+        self.report_text.delete("1.0", tk.END); self.report_text.insert("1.0", "".join(parts))
+
+    @staticmethod
+    def _fold_total(acc, o):
+        acc[0] += float(o.total)
+
+    @staticmethod
+    def _fold_item_qty(cnt, o):
+        for it in o.items: cnt[it["name"]] += it["qty"]
+
+    @staticmethod
+    def _fold_customer_spend(cnt, o):
+        cnt[o.customer.split(" (", 1)[0]] += o.total
+
+    @staticmethod
+    def _fold_daily_sales(totals, o):
+        totals[o.created_at[:10]] += o.total  # created_at is isoformat: YYYY-MM-DDTHH:MM:SS
 
     def report_top_selling(self):
-        cnt = Counter()
-        for o in self.orders:
-            for it in o.items: cnt[it["name"]] += it["qty"]
+        cnt = self.fold_orders("top_selling", Counter, self._fold_item_qty)
         if not cnt:
             self.report_text.delete("1.0", tk.END); self.report_text.insert("1.0", "No sales yet."); return
-        out = "Top selling products:\n\n"
-        for name, qty in cnt.most_common(20): out += f"{name}: {qty}\n"
-        self.report_text.delete("1.0", tk.END); self.report_text.insert("1.0", out)
+        parts = ["Top selling products:\n\n"]
+        parts.extend(f"{name}: {qty}\n" for name, qty in cnt.most_common(20))
+        self.report_text.delete("1.0", tk.END); self.report_text.insert("1.0", "".join(parts))
 
     def report_top_customers(self):
-        cnt = Counter()
-        for o in self.orders:
-            cname = o.customer.split(" (")[0]
-            cnt[cname] += o.total
+        cnt = self.fold_orders("top_customers", Counter, self._fold_customer_spend)
         if not cnt:
             self.report_text.delete("1.0", tk.END); self.report_text.insert("1.0", "No orders yet."); return
-        out = "Top customers by spend:\n\n"
-        for name, val in cnt.most_common(20): out += f"{name}: ₹{val:.2f}\n"
-        self.report_text.delete("1.0", tk.END); self.report_text.insert("1.0", out)
+        parts = ["Top customers by spend:\n\n"]
+        parts.extend(f"{name}: ₹{val:.2f}\n" for name, val in cnt.most_common(20))
+        self.report_text.delete("1.0", tk.END); self.report_text.insert("1.0", "".join(parts))
 
     def report_sales_chart(self):
         if not MATPLOTLIB_AVAILABLE:
-            messagebox.showinfo("Chart", "matplotlib not available. Install matplotlib and pillow to enable charts.")
+            messagebox.showinfo("Chart", "matplotlib not available. Install matplotlib to enable charts.")
             return
         # simple daily sales bar chart (by date)
-        totals = defaultdict(float)
-        for o in self.orders:
-            date = o.created_at.split("T")[0]
-            totals[date] += o.total
+        totals = self.fold_orders("daily_sales", lambda: defaultdict(float), self._fold_daily_sales)
         if not totals:
             messagebox.showinfo("Chart", "No sales data to plot")
             return
-        dates = sorted(totals.keys())
-        vals = [totals[d] for d in dates]
-        plt.figure(figsize=(8,4))
-        plt.bar(dates, vals)
-        plt.xticks(rotation=45, ha='right')
-        plt.title('Daily sales')
-        plt.tight_layout()
-        img_path = os.path.join(APP_DIR, 'sales_chart.png')
-        plt.savefig(img_path)
-        plt.close()
-        # show image in Toplevel
+        dates, vals = zip(*sorted(totals.items()))  # one sorted pass, no second lookup per date
+        # draw straight onto a canvas in the Toplevel (no PNG written and read back)
+        fig = Figure(figsize=(8,4))
+        ax = fig.add_subplot()
+        ax.bar(dates, vals)
+        ax.tick_params(axis='x', labelrotation=45)
+        for label in ax.get_xticklabels(): label.set_horizontalalignment('right')
+        ax.set_title('Daily sales')
+        fig.tight_layout()
         win = tk.Toplevel(self); win.title('Sales chart')
-        img = Image.open(img_path)
-        tkimg = ImageTk.PhotoImage(img)
-        lbl = ttk.Label(win, image=tkimg); lbl.image = tkimg; lbl.pack()
+        canvas = FigureCanvasTkAgg(fig, master=win)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill="both", expand=True)
 
     # -------- Settings Tab --------
     def _build_settings_tab(self, parent):
@@ -1092,9 +1633,8 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         # Theme (if ttkbootstrap available)
         if TB_AVAILABLE and STYLE is not None:
             ttk.Label(frame, text="Theme:").pack(pady=6)
-            themes = STYLE.theme_names()
             self.theme_var = tk.StringVar(value=STYLE.theme_use())
-            combo = ttk.Combobox(frame, values=themes, textvariable=self.theme_var, state="readonly")
+            combo = ttk.Combobox(frame, values=THEME_NAMES, textvariable=self.theme_var, state="readonly")
             combo.pack()
             ttk.Button(frame, text="Apply Theme", command=self.apply_theme).pack(pady=6)
 
@@ -1104,29 +1644,11 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
         ttk.Button(frame, text='Add user', command=self.add_user_dialog).pack(pady=4)
         ttk.Button(frame, text='List users', command=self.list_users).pack(pady=4)
 
-        # --- Theme Toggle ---
-        ttk.Label(frame, text="Theme:").pack(pady=6)
-        self.theme_var = tk.StringVar(value="light")
-        theme_combo = ttk.Combobox(frame, values=["light", "dark"], textvariable=self.theme_var, state="readonly")
-        theme_combo.pack()
-        ttk.Button(frame, text="Apply Theme", command=self.apply_theme).pack(pady=6)
-
-
-    def apply_theme(self):
-        if not TB_AVAILABLE:
-            messagebox.showinfo("Theme", "ttkbootstrap not available.")
-            return
-        mode = self.theme_var.get()
-        if mode == "dark":
-            STYLE.theme_use("darkly")   # bootstrap dark theme
-        else:
-            STYLE.theme_use("flatly")   # bootstrap light theme
-
 
     def export_all_data(self):
         path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON","*.json")])
         if not path: return
-        data = {"products": [p.to_dict() for p in self.products], "orders": [o.to_dict() for o in self.orders], "next_pid": self.next_pid, "next_oid": self.next_oid}
+        data = {"products": [p.to_dict() for p in self.products], "orders": self.order_dicts(), "next_pid": self.next_pid, "next_oid": self.next_oid}
         save_json(path, data); messagebox.showinfo("Export", f"Exported all data to {path}")
 
     def import_all_data(self):
@@ -1137,15 +1659,20 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
             messagebox.showerror("Import", "Invalid JSON"); return
         self.products = [Product.from_dict(d) for d in data.get("products", [])]
         self.orders = [OrderRecord.from_dict(d) for d in data.get("orders", [])]
-        self.next_pid = data.get("next_pid", max((p.product_id for p in self.products), default=0)+1)
-        self.next_oid = data.get("next_oid", max((o.order_id for o in self.orders), default=999)+1)
-        self.save_data(); self.refresh_inventory_table(); self.refresh_orders_table(); self.refresh_product_combobox()
+        # the export always carries the counters; only scan for the max ids when a file lacks them
+        self.next_pid = data.get("next_pid") or max((p.product_id for p in self.products), default=0)+1
+        self.next_oid = data.get("next_oid") or max((o.order_id for o in self.orders), default=999)+1
+        self.reindex_products()
+        self.rewrite_orders_log()
+        self._mark_dirty(); self.refresh_inventory_table(); self.refresh_orders_table(); self.refresh_product_combobox()
         messagebox.showinfo("Import", "All data imported")
 
     def clear_all_data(self):
         if not messagebox.askyesno("Confirm", "This will clear all products and orders. Continue?"): return
         self.products = []; self.orders = []; self.next_pid = 1; self.next_oid = 1000
-        self.save_data(); self.refresh_inventory_table(); self.refresh_orders_table(); self.refresh_product_combobox()
+        self.reindex_products()
+        self.rewrite_orders_log()
+        self._mark_dirty(); self.refresh_inventory_table(); self.refresh_orders_table(); self.refresh_product_combobox()
         messagebox.showinfo("Reset", "Data cleared")
 
     def apply_theme(self):
@@ -1158,7 +1685,13 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
                 messagebox.showerror("Theme", str(e))
 
     def backup_now(self):
-        save_json(BACKUP_FILE, {"products": [p.to_dict() for p in self.products], "orders": [o.to_dict() for o in self.orders], "next_pid": self.next_pid, "next_oid": self.next_oid})
+        self._write_errors.pop(BACKUP_FILE, None)
+        self.backup_and_notify()
+        self._write_q.join()
+        err = self._write_errors.get(BACKUP_FILE)
+        if err is not None:
+            messagebox.showerror("Backup", f"Backup failed: {err}")
+            return
         messagebox.showinfo("Backup", f"Backup saved to {BACKUP_FILE}")
 
     def apply_threshold(self):
@@ -1204,16 +1737,17 @@ class RetailPOSApp(tb.Window if TB_AVAILABLE else tk.Tk):
 
 
     # -------- Utilities --------
-    def refresh_product_combobox(self):
-        if hasattr(self, "prod_combo"):
-            vals = [f"{p.product_id} | {p.name} (₹{p.price:.2f}) [{p.quantity}]" for p in self.products]
-            self.prod_combo['values'] = vals
-
     def backup_and_notify(self):
-        save_json(BACKUP_FILE, {"products": [p.to_dict() for p in self.products], "orders": [o.to_dict() for o in self.orders], "next_pid": self.next_pid, "next_oid": self.next_oid})
+        self._backup_seq = self._change_seq
+        self.queue_write(BACKUP_FILE, {"products": [p.to_dict() for p in self.products], "orders": self.order_dicts(), "next_pid": self.next_pid, "next_oid": self.next_oid})
+
+    def low_stock_products(self) -> List[Product]:
+        threshold = self.low_stock_threshold
+        return [p for p in self.products if p.quantity <= threshold]
 
     def check_low_stock_startup(self):
-        low = [p for p in self.products if p.quantity <= self.low_stock_threshold]
+        self._low_stock_after = None
+        low = self.low_stock_products()
         if low:
             names = '\n'.join([f"{p.name}: {p.quantity}" for p in low])
             messagebox.showwarning("Low stock warning", f"The following items are low in stock (<= {self.low_stock_threshold}):\n{names}")
@@ -1273,18 +1807,40 @@ class PaymentDialog(tk.Toplevel):
         ttk.Label(self, text='Method:').grid(row=1, column=0, padx=6, pady=6)
         self.method = tk.StringVar(value='Cash')
         cb = ttk.Combobox(self, values=['Cash','Card','UPI','Split'], textvariable=self.method, state='readonly'); cb.grid(row=1, column=1, padx=6, pady=6)
+        cb.bind('<<ComboboxSelected>>', self.on_method_changed)
         ttk.Label(self, text='Details (optional):').grid(row=2, column=0, padx=6, pady=6)
         self.details = ttk.Entry(self); self.details.grid(row=2, column=1, padx=6, pady=6)
-        ttk.Button(self, text='Pay', command=self.on_pay).grid(row=3, column=0, padx=6, pady=6)
-        ttk.Button(self, text='Cancel', command=self.destroy).grid(row=3, column=1, padx=6, pady=6)
+        # split payment fields, shown only while 'Split' is selected (no extra prompt dialogs)
+        self.split_frame = ttk.Frame(self)
+        ttk.Label(self.split_frame, text='Amount for method 1:').grid(row=0, column=0, padx=6, pady=6)
+        self.split_amount = ttk.Entry(self.split_frame); self.split_amount.grid(row=0, column=1, padx=6, pady=6)
+        ttk.Label(self.split_frame, text='Method 1:').grid(row=1, column=0, padx=6, pady=6)
+        self.split_method = ttk.Combobox(self.split_frame, values=['Cash','Card','UPI'], state='readonly'); self.split_method.grid(row=1, column=1, padx=6, pady=6)
+        self.split_method.set('Cash')
+        self.split_frame.grid(row=3, column=0, columnspan=2)
+        self.split_frame.grid_remove()
+        ttk.Button(self, text='Pay', command=self.on_pay).grid(row=4, column=0, padx=6, pady=6)
+        ttk.Button(self, text='Cancel', command=self.destroy).grid(row=4, column=1, padx=6, pady=6)
+
+    def on_method_changed(self, _event=None):
+        if self.method.get() == 'Split':
+            self.split_frame.grid()
+            self.split_amount.focus_set()
+        else:
+            self.split_frame.grid_remove()
 
     def on_pay(self):
         m = self.method.get(); d = self.details.get().strip()
         if m == 'Split':
-            # simple split: ask for two parts
-            a1 = simpledialog.askfloat('Split', 'Amount for method 1', minvalue=0.0, maxvalue=self.amount)
-            if a1 is None: return
-            m1 = simpledialog.askstring('Split', 'Method 1 (Cash/Card/UPI)');
+            # simple split: method 1 pays the entered amount, the rest is 'Remaining'
+            try:
+                a1 = float(self.split_amount.get().strip())
+            except ValueError:
+                a1 = -1.0
+            if not 0.0 <= a1 <= self.amount:
+                messagebox.showwarning('Split', f'Enter an amount between 0 and {self.amount:.2f}', parent=self)
+                return
+            m1 = self.split_method.get()
             a2 = self.amount - a1
             m2 = 'Remaining'
             self.result = {"method": 'Split', "details": {m1: a1, m2: a2}}
@@ -1328,11 +1884,70 @@ class AddUserDialog(tk.Toplevel):
         self.result = (u, p, r)
         self.destroy()
 
-# --- Run POS wrapper ---
-def run_pos_app(username, on_logout=None):
-    app = RetailPOSApp(username, on_logout=on_logout)
-    app.mainloop()
+# --- App root: one Tk window for the whole session; views are frames raised in place ---
+class AppRoot(tb.Window if TB_AVAILABLE else tk.Tk):
+    def __init__(self):
+        if TB_AVAILABLE:
+            super().__init__(themename="flatly")
+        else:
+            super().__init__()
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        # loaded once per run, shared by the login and POS views
+        self.user_store = UserStore()
+        self.customer_store = CustomerStore()
+
+        self.landing = LandingPage(self)
+        self.login = LoginPage(self)
+        self.pos: Optional[RetailPOSApp] = None
+        for view in (self.landing, self.login):
+            view.grid(row=0, column=0, sticky="nsew")
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.show_landing()
+
+    def show_landing(self):
+        self.title("Welcome to SmartMart POS")
+        self.geometry("800x500")
+        self.resizable(False, False)
+        self._raise_view(self.landing)
+
+    def show_login(self):
+        self.title("Login - SmartMart POS")
+        self.geometry("400x300")
+        self.resizable(False, False)
+        self.config(menu="")
+        self._raise_view(self.login)
+        self.login.username_entry.focus_set()
+
+    def show_pos(self, username):
+        # keep the POS view (and its in-memory data) across logout/login of the same user
+        if self.pos is not None and self.pos.current_user != username:
+            self.pos.destroy()
+            self.pos = None
+        if self.pos is None:
+            self.pos = RetailPOSApp(self, username, on_logout=self.show_login)
+            self.pos.grid(row=0, column=0, sticky="nsew")
+        self._hide_views_except(self.pos)
+        self.pos.show()  # grids and raises itself, restarting its timers
+
+    def _hide_views_except(self, view):
+        # unmap, not just cover: a covered frame is still viewable, so Tab could reach its widgets
+        for other in (self.landing, self.login, self.pos):
+            if other is not None and other is not view:
+                other.grid_remove()
+
+    def _raise_view(self, view):
+        self._hide_views_except(view)
+        view.grid()  # grid_remove kept the row/column/sticky options
+        view.tkraise()
+
+    def on_close(self):
+        if self.pos is not None:
+            self.pos.shutdown_io()
+        self.destroy()
 
 # --- Start app ---
 if __name__ == "__main__":
-    LandingPage().mainloop()
+    AppRoot().mainloop()